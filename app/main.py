@@ -1,117 +1,318 @@
-from typing import List, Optional, Set, Dict
+from typing import Any, Callable, List, Optional, Set, Dict, Tuple, Union
+import re
 from enum import Enum
-from fastapi import FastAPI, Query, Path, Body
+import msgspec
+import orjson
+from fastapi import FastAPI, Query, Path, Body, Response, Request, Depends
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.constants import REF_PREFIX
+from fastapi.openapi.utils import validation_error_definition, validation_error_response_definition
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.datastructures import URLPath
+from starlette.routing import BaseRoute, Match, NoMatchFound, Route
+from starlette.types import Receive, Scope, Send
 from pydantic import BaseModel, Field, HttpUrl
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import BoolError, DictError, FloatError, IntegerError, ListError, MissingError, StrError
 
 
-class Item(BaseModel):
+class Item(msgspec.Struct, kw_only=True):
     name: str
     description: Optional[str] = None
     price: float
     tax: Optional[float] = None
 
 
+# msgspec appends the location of a validation failure as a JSON path, e.g. "Expected `float`, got `str` - at `$.price`".
+# These messages are not a stable msgspec API, which is why the Pipfile pins msgspec to the 0.18 series.
+_MSGSPEC_ERROR_PATH_RE = re.compile(r" - at `\$(.*)`$")
+_MSGSPEC_MISSING_FIELD_RE = re.compile(r"^Object missing required field `(.+)`$")
+_MSGSPEC_EXPECTED_TYPE_RE = re.compile(r"^Expected `(\w+)")
+# pydantic v1's error for each JSON type msgspec expected, so 422s keep types like 'type_error.float'
+_PYDANTIC_TYPE_ERRORS = {
+    "str": StrError,
+    "int": IntegerError,
+    "float": FloatError,
+    "bool": BoolError,
+    "object": DictError,
+    "array": ListError,
+}
+
+
+def msgspec_validation_error(exc: msgspec.DecodeError) -> RequestValidationError:
+    """Converts a msgspec decode error into FastAPI's validation error, so the 422 payload keeps its usual shape"""
+    message = str(exc)
+    loc: List[Union[str, int]] = ["body"]
+    path_match = _MSGSPEC_ERROR_PATH_RE.search(message)
+    if path_match:
+        message = message[:path_match.start()]
+        loc += [int(part) if part.isdigit() else part for part in re.findall(r"[^.\[\]]+", path_match.group(1))]
+    missing_match = _MSGSPEC_MISSING_FIELD_RE.match(message)
+    if missing_match:
+        return RequestValidationError([ErrorWrapper(MissingError(), loc=(*loc, missing_match.group(1)))])
+    expected_match = _MSGSPEC_EXPECTED_TYPE_RE.match(message)
+    if expected_match and expected_match.group(1) in _PYDANTIC_TYPE_ERRORS:
+        return RequestValidationError([ErrorWrapper(_PYDANTIC_TYPE_ERRORS[expected_match.group(1)](), loc=tuple(loc))])
+    return RequestValidationError([ErrorWrapper(ValueError(message), loc=tuple(loc))])
+
+
+def pydantic_coercions(body_type: type, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Applies the scalar coercions pydantic v1 accepted and msgspec's lax mode does not: numbers to str, bool to float"""
+    coerced = dict(data)
+    for field in msgspec.structs.fields(body_type):
+        value = coerced.get(field.encode_name)
+        field_types = (field.type, *getattr(field.type, "__args__", ()))
+        if str in field_types and isinstance(value, (int, float)):
+            coerced[field.encode_name] = str(value)
+        elif float in field_types and isinstance(value, bool):
+            coerced[field.encode_name] = float(value)
+    return coerced
+
+
+def decode_json_body(body: bytes, body_type: type) -> Any:
+    """Decodes and validates a JSON request body in a single msgspec pass, accepting what pydantic v1 accepted"""
+    if not body:
+        raise RequestValidationError([ErrorWrapper(MissingError(), loc=("body",))])
+    try:
+        return msgspec.json.decode(body, type=body_type, strict=False)
+    except msgspec.ValidationError as exc:
+        error = exc
+    except msgspec.DecodeError as exc:
+        raise msgspec_validation_error(exc)
+    # Rare slow path: retry once with the remaining pydantic coercions applied before reporting the error
+    data = msgspec.json.decode(body)
+    if isinstance(data, dict):
+        try:
+            return msgspec.convert(pydantic_coercions(body_type, data), type=body_type, strict=False)
+        except msgspec.ValidationError:
+            pass
+    raise msgspec_validation_error(error)
+
+
+def msgspec_body(body_type: type) -> Callable:
+    """Builds a request body dependency for a msgspec type, the type is also added to the OpenAPI schema"""
+
+    async def decode_body(request: Request) -> Any:
+        return decode_json_body(await request.body(), body_type)
+
+    decode_body.body_type = body_type
+    return decode_body
+
+
+item_body = msgspec_body(Item)
+
+
 class ModelName(str, Enum):
     alexnet = "alexnet"
     resnet = "resnet"
     lenet = "lenet"
 
 
-app = FastAPI()
+class AppJSONResponse(ORJSONResponse):
+    """orjson response that also accepts non-str dict keys (e.g. '/index-weights/') and numpy values"""
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except orjson.JSONEncodeError:
+            # orjson only handles 64-bit integers, the stdlib encoder takes any int a path or body may carry
+            return JSONResponse.render(self, content)
+
+
+class LiteralRoutes(BaseRoute):
+    """Serves the parameterless routes (e.g. '/users/me', '/items/') of a route list with a single dict lookup.
+
+    Insert it in front of the router's routes once they are all registered, requests it does not know
+    fall through to Starlette's linear scan of the remaining routes. `aliases` maps extra request paths
+    onto a literal route path without rewriting the request path, e.g. {"/": "/hello_world"}.
+    """
+
+    def __init__(self, routes: List[BaseRoute], aliases: Optional[Dict[str, str]] = None) -> None:
+        self.table: Dict[Tuple[str, str], Route] = {}
+        self.aliases: Dict[str, Route] = {}
+        for index, route in enumerate(routes):
+            if not isinstance(route, Route) or route.param_convertors or not route.methods:
+                continue
+            for method in route.methods:
+                # Route order matters, so skip requests that an earlier route would claim first
+                if not self._is_claimed(routes[:index], method, route.path):
+                    self.table.setdefault((method, route.path), route)
+        for alias, target in (aliases or {}).items():
+            for (method, path), route in list(self.table.items()):
+                if path == target and not self._is_claimed(routes, method, alias):
+                    self.table[(method, alias)] = route
+                    self.aliases[alias] = route
+
+    @staticmethod
+    def _is_claimed(routes: List[BaseRoute], method: str, path: str) -> bool:
+        return any(
+            not isinstance(route, Route)
+            or (route.path_regex.match(path) and (not route.methods or method in route.methods))
+            for route in routes
+        )
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] == "http":
+            route = self.table.get((scope["method"], scope["path"]))
+            if route is not None:
+                return Match.FULL, {"endpoint": route.endpoint, "path_params": dict(scope.get("path_params", {}))}
+            # Other methods on an alias get the target route's 405, like on the target path itself
+            if scope["path"] in self.aliases:
+                return Match.PARTIAL, {"endpoint": self.aliases[scope["path"]].endpoint, "path_params": {}}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, **path_params: str) -> URLPath:
+        raise NoMatchFound()
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.table.get((scope["method"], scope["path"])) or self.aliases[scope["path"]]
+        await route.handle(scope, receive, send)
+
+
+app = FastAPI(default_response_class=AppJSONResponse)
+# Small bodies are sent as is, compressing them costs more than it saves
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+
+def openapi() -> Dict[str, Any]:
+    """OpenAPI schema extended with the request bodies that msgspec decodes instead of FastAPI"""
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema = FastAPI.openapi(app)
+    components = schema.setdefault("components", {}).setdefault("schemas", {})
+    components.setdefault("ValidationError", validation_error_definition)
+    components.setdefault("HTTPValidationError", validation_error_response_definition)
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        body_type = next(
+            (dep.call.body_type for dep in route.dependant.dependencies if hasattr(dep.call, "body_type")), None
+        )
+        if body_type is None:
+            continue
+        (body_schema,), body_components = msgspec.json.schema_components((body_type,), ref_template=REF_PREFIX + "{name}")
+        components.update(body_components)
+        for method in route.methods:
+            operation = schema["paths"][route.path_format][method.lower()]
+            operation["requestBody"] = {"content": {"application/json": {"schema": body_schema}}, "required": True}
+            operation["responses"].setdefault("422", {
+                "description": "Validation Error",
+                "content": {"application/json": {"schema": {"$ref": REF_PREFIX + "HTTPValidationError"}}},
+            })
+    return schema
+
+
+app.openapi = openapi
 
 fake_items_db = [{"item_name": "Foo1"}, {"item_name": "Bar2"}, {"item_name": "Baz3"}, {"item_name": "Hay4"}]
 
+# Constant response bodies are serialized once at import time
+_HELLO_BYTES = orjson.dumps({"message": "Hello World, E!"})
+_USER_ME_BYTES = orjson.dumps({"user_id": "the current user"})
+
+_MODEL_MESSAGES = {
+    ModelName.alexnet: "Deep Learning FTW!",
+    ModelName.lenet: "LeCNN all the images",
+    ModelName.resnet: "Have some residuals",
+}
+_MODEL_BYTES = {
+    model_name: orjson.dumps({"model_name": model_name.value, "message": message})
+    for model_name, message in _MODEL_MESSAGES.items()
+}
+
+# Fixed fragments of the item responses; only the user supplied values are encoded per request
+_ITEM_ID_PREFIX = b'{"item_id":'
+_OWNER_ID_KEY = b',"owner_id":'
+_Q_KEY = b',"q":'
+_LONG_DESCRIPTION_TAIL = b',"description":' + orjson.dumps("This is an amazing item that has a long description") + b"}"
+_SHORT_DESCRIPTION_TAIL = b',"description":' + orjson.dumps("short description") + b"}"
+
+# Every '/items/' page for skip in [0, len(fake_items_db)] and limit in [0, 20], keyed by (skip, limit)
+_ITEMS_SLICE_BYTES = {
+    (skip, limit): orjson.dumps(fake_items_db[skip: skip + limit])
+    for skip in range(len(fake_items_db) + 1)
+    for limit in range(21)
+}
+
 
-@app.get("/")
 @app.get("/hello_world")
 async def hello_world():
-    """Hello world endpoint for testing if FastAPI works properly"""
-    return {"message": "Hello World, E!"}
+    """Hello world endpoint for testing if FastAPI works properly, also served on '/' by LiteralRoutes"""
+    return Response(content=_HELLO_BYTES, media_type="application/json")
 
 
 @app.get("/items/")
 async def read_item(skip: int = 0, limit: int = 10):
     """Accepting query parameters"""
-    return fake_items_db[skip: skip + limit]
+    content = _ITEMS_SLICE_BYTES.get((skip, limit))
+    if content is None:
+        content = orjson.dumps(fake_items_db[skip: skip + limit])
+    return Response(content=content, media_type="application/json")
 
 
 @app.get("/items/{item_id}")
 async def read_item(item_id: str, q: Optional[str] = None, short: bool = False):
     """Items endpoint for testing path parameters with optional query parameters"""
-    item = {"item_id": item_id}
-    if q:
-        item.update({"q": q})
-    if not short:
-        item.update(
-            {"description": "This is an amazing item that has a long description"}
-        )
-    else:
-        item.update(
-            {"description": "short description"}
-        )
-    return item
+    parts = [_ITEM_ID_PREFIX, orjson.dumps(item_id)]
+    if q is not None:
+        parts += (_Q_KEY, orjson.dumps(q))
+    parts.append(_SHORT_DESCRIPTION_TAIL if short else _LONG_DESCRIPTION_TAIL)
+    return Response(content=b"".join(parts), media_type="application/json")
 
 
 @app.get("/users/me")
 async def read_user_me():
     """Path order matters. '/users/me' should come first and '/users/{user_id}' can come only after that"""
-    return {"user_id": "the current user"}
+    return Response(content=_USER_ME_BYTES, media_type="application/json")
 
 
 @app.get("/users/{user_id}")
 async def read_user(user_id: str):
     """Path order matters. '/users/me' should come first and '/users/{user_id}' can come only after that"""
-    return {"user_id": user_id}
+    return AppJSONResponse({"user_id": user_id})
 
 
 @app.get("/models/{model_name}")
 async def get_model(model_name: ModelName):
     """Path with predefined values"""
-    if model_name == ModelName.alexnet:
-        return {"model_name": model_name, "message": "Deep Learning FTW!"}
-
-    if model_name.value == "lenet":
-        return {"model_name": model_name, "message": "LeCNN all the images"}
-
-    return {"model_name": model_name, "message": "Have some residuals"}
+    return Response(content=_MODEL_BYTES[model_name], media_type="application/json")
 
 
 @app.get("/files/{file_path:path}")
 async def read_file(file_path: str):
     """Path parameters containing paths"""
-    return {"file_path": file_path}
+    return AppJSONResponse({"file_path": file_path})
 
 
 @app.get("/users_multi/{user_id}/items/{item_id}")
 async def read_user_item(user_id: int, item_id: str, q: Optional[str] = None, short: bool = False):
     """Multiple path and query parameters"""
-    item = {"item_id": item_id, "owner_id": user_id}
-    if q:
-        item.update({"q": q})
-    if not short:
-        item.update(
-            {"description": "This is an amazing item that has a long description"}
-        )
-    return item
+    parts = [_ITEM_ID_PREFIX, orjson.dumps(item_id), _OWNER_ID_KEY, str(user_id).encode()]
+    if q is not None:
+        parts += (_Q_KEY, orjson.dumps(q))
+    parts.append(b"}" if short else _LONG_DESCRIPTION_TAIL)
+    return Response(content=b"".join(parts), media_type="application/json")
 
 
 @app.post("/items/")
-async def create_item(item: Item):
+async def create_item(item: Item = Depends(item_body)):
     """Accepting data in the request body for a POST endpoint"""
-    item_dict = item.dict()
-    if item.tax:
+    item_dict = msgspec.structs.asdict(item)
+    if item.tax is not None:
         price_with_tax = item.price + item.tax
-        item_dict.update({"price_with_tax": price_with_tax})
-    return item_dict
+        item_dict["price_with_tax"] = price_with_tax
+    return Response(content=msgspec.json.encode(item_dict), media_type="application/json")
 
 
 @app.put("/items/{item_id}")
-async def create_item(item_id: int, item: Item, q: Optional[str] = None):
+async def create_item(item_id: int, q: Optional[str] = None, item: Item = Depends(item_body)):
     """Request body + path + query parameters"""
-    result = {"item_id": item_id, **item.dict()}
-    if q:
-        result.update({"q": q})
-    return result
+    result = {"item_id": item_id, **msgspec.structs.asdict(item)}
+    if q is not None:
+        result["q"] = q
+    return Response(content=msgspec.json.encode(result), media_type="application/json")
 
 
 #
@@ -125,23 +326,23 @@ async def create_item(item_id: int, item: Item, q: Optional[str] = None):
 # No default value, but 'q' is a required parameter:
 async def read_items(q: Optional[str] = Query(..., min_length=3, max_length=50)):
     results = {"items": [{"item_id": "Foo"}, {"item_id": "Bar"}]}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Query parameter list / multiple values
 @app.get("/itemsv3/")
 async def read_items(q: Optional[List[str]] = Query(None)):
     query_items = {"q": q}
-    return query_items
+    return AppJSONResponse(query_items)
 
 
 # Query parameter list / multiple values with defaults
 @app.get("/itemsv4/")
 async def read_items(q: List[str] = Query(["foo", "bar"])):
     query_items = {"q": q}
-    return query_items
+    return AppJSONResponse(query_items)
 
 
 # Declare more metadata
@@ -155,18 +356,18 @@ async def read_items(
         )
 ):
     results = {"items": [{"item_id": "Foo"}, {"item_id": "Bar"}]}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Alias parameters
 @app.get("/itemsv6/")
 async def read_items(q: Optional[str] = Query(None, alias="item-query")):
     results = {"items": [{"item_id": "Foo"}, {"item_id": "Bar"}]}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Deprecating parameters
@@ -184,9 +385,9 @@ async def read_items(
         )
 ):
     results = {"items": [{"item_id": "Foo"}, {"item_id": "Bar"}]}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Path Parameters and Numeric Validations
@@ -195,9 +396,9 @@ async def read_items(item_id: int = Path(..., title="The ID of the item to get")
                      q: Optional[str] = Query(None, alias="item-query"),
                      ):
     results = {"item_id": item_id}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Number validations: greater than and less than or equal
@@ -208,9 +409,9 @@ async def read_items(
     q: str,
 ):
     results = {"item_id": item_id}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Number validations: floats, greater than and less than
@@ -222,9 +423,9 @@ async def read_items(
     size: float = Query(..., ge=1.1, le=10.5)
 ):
     results = {"item_id": item_id, "size": size}
-    if q:
-        results.update({"q": q})
-    return results
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Body - Multiple Parameters
@@ -244,11 +445,11 @@ async def update_item(
     item: Optional[BodyItem] = None,
 ):
     results = {"item_id": item_id}
-    if q:
-        results.update({"q": q})
-    if item:
-        results.update({"item": item})
-    return results
+    if q is not None:
+        results["q"] = q
+    if item is not None:
+        results["item"] = item.__dict__
+    return AppJSONResponse(results)
 
 
 # Multiple body parameters
@@ -259,8 +460,8 @@ class BodyUser(BaseModel):
 
 @app.put("/body_items_v1/{item_id}")
 async def update_item(item_id: int, item: BodyItem, user: BodyUser):
-    results = {"item_id": item_id, "item": item, "user": user}
-    return results
+    results = {"item_id": item_id, "item": item.__dict__, "user": user.__dict__}
+    return AppJSONResponse(results)
 
 
 # Singular values in body
@@ -268,8 +469,8 @@ async def update_item(item_id: int, item: BodyItem, user: BodyUser):
 async def update_item(
     item_id: int, item: BodyItem, user: BodyUser, importance: int = Body(...)
 ):
-    results = {"item_id": item_id, "item": item, "user": user, "importance": importance}
-    return results
+    results = {"item_id": item_id, "item": item.__dict__, "user": user.__dict__, "importance": importance}
+    return AppJSONResponse(results)
 
 
 # Multiple body params and query
@@ -282,17 +483,17 @@ async def update_item(
     importance: int = Body(..., gt=0),
     q: Optional[str] = None
 ):
-    results = {"item_id": item_id, "item": item, "user": user, "importance": importance}
-    if q:
-        results.update({"q": q})
-    return results
+    results = {"item_id": item_id, "item": item.__dict__, "user": user.__dict__, "importance": importance}
+    if q is not None:
+        results["q"] = q
+    return AppJSONResponse(results)
 
 
 # Embed a single body parameter
 @app.put("/body_items_v4/{item_id}")
 async def update_item(item_id: int, item: BodyItem = Body(..., embed=True)):
-    results = {"item_id": item_id, "item": item}
-    return results
+    results = {"item_id": item_id, "item": item.__dict__}
+    return AppJSONResponse(results)
 
 
 # Body - Fields
@@ -415,3 +616,7 @@ async def create_offer(offer: OfferNested):
 @app.post("/index-weights/")
 async def create_index_weights(weights: Dict[int, float]):
     return weights
+
+
+# Must stay last: the literal path table is built from the routes registered above
+app.router.routes.insert(0, LiteralRoutes(app.router.routes, aliases={"/": "/hello_world"}))
@@ -1,5 +1,6 @@
-from app.main import app
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.environ.get("UVICORN_WORKERS", os.cpu_count() or 1))
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools", workers=workers)
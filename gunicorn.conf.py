@@ -0,0 +1,24 @@
+import os
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("UVICORN_WORKERS", os.cpu_count() or 1))
+
+
+def pre_fork(server, worker):
+    """Assigns the new worker a CPU that no live worker holds, respawned workers take over the freed core"""
+    worker.cpu = None
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    held = {getattr(live, "cpu", None) for live in server.WORKERS.values()}
+    free = [cpu for cpu in cpus if cpu not in held]
+    worker.cpu = free[0] if free else cpus[len(server.WORKERS) % len(cpus)]
+
+
+def post_fork(server, worker):
+    """Pins the worker process to the CPU chosen in pre_fork"""
+    if worker.cpu is None:
+        return
+    os.sched_setaffinity(0, {worker.cpu})
+    server.log.info("Worker %s pinned to CPU %s", worker.pid, worker.cpu)
@@ -0,0 +1,40 @@
+"""Fails if a route handler decorated with '@app.<method>' is a plain 'def'.
+
+Sync handlers are dispatched to the threadpool instead of running on the event loop,
+so every endpoint in this app is expected to be declared with 'async def'.
+"""
+import ast
+import sys
+
+ROUTE_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "trace", "api_route"}
+
+
+def is_route_decorator(decorator: ast.expr) -> bool:
+    return (
+        isinstance(decorator, ast.Call)
+        and isinstance(decorator.func, ast.Attribute)
+        and decorator.func.attr in ROUTE_METHODS
+        and isinstance(decorator.func.value, ast.Name)
+        and decorator.func.value.id == "app"
+    )
+
+
+def check_file(path: str) -> list:
+    with open(path, encoding="utf-8") as source:
+        tree = ast.parse(source.read(), filename=path)
+    errors = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and any(is_route_decorator(d) for d in node.decorator_list):
+            errors.append(f"{path}:{node.lineno}: route handler '{node.name}' must be declared with 'async def'")
+    return errors
+
+
+def main(paths: list) -> int:
+    errors = [error for path in paths for error in check_file(path)]
+    for error in errors:
+        print(error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or ["app/main.py"]))
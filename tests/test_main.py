@@ -0,0 +1,197 @@
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.main import LiteralRoutes, app
+
+client = TestClient(app)
+
+
+def test_create_item_adds_price_with_tax():
+    response = client.post("/items/", json={"name": "Foo", "price": 1.5, "tax": 0.5})
+    assert response.status_code == 200
+    assert response.json() == {"name": "Foo", "description": None, "price": 1.5, "tax": 0.5, "price_with_tax": 2.0}
+
+
+def test_create_item_missing_body_keeps_validation_error_shape():
+    response = client.post("/items/")
+    assert response.status_code == 422
+    assert response.json() == {"detail": [{"loc": ["body"], "msg": "field required", "type": "value_error.missing"}]}
+
+
+def test_create_item_missing_field_keeps_validation_error_shape():
+    response = client.post("/items/", json={"name": "Foo"})
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [{"loc": ["body", "price"], "msg": "field required", "type": "value_error.missing"}]
+    }
+
+
+def test_create_item_invalid_field_keeps_pydantic_error_type():
+    response = client.post("/items/", json={"name": "Foo", "price": "cheap"})
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [{"loc": ["body", "price"], "msg": "value is not a valid float", "type": "type_error.float"}]
+    }
+
+
+def test_create_item_non_object_body_keeps_pydantic_error_type():
+    response = client.post("/items/", json=[1])
+    assert response.status_code == 422
+    assert response.json() == {"detail": [{"loc": ["body"], "msg": "value is not a valid dict", "type": "type_error.dict"}]}
+
+
+def test_create_item_request_body_is_documented():
+    schema = client.get("/openapi.json").json()
+    operation = schema["paths"]["/items/"]["post"]
+    assert operation["requestBody"]["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Item"}
+    assert "422" in operation["responses"]
+    assert set(schema["components"]["schemas"]["Item"]["required"]) == {"name", "price"}
+
+
+def test_literal_path_wins_over_later_path_parameter_route():
+    assert client.get("/users/me").json() == {"user_id": "the current user"}
+    assert client.get("/users/someone").json() == {"user_id": "someone"}
+
+
+def test_literal_path_with_unsupported_method_is_still_405():
+    assert client.delete("/items/").status_code == 405
+    assert client.put("/hello_world").status_code == 405
+
+
+def test_literal_path_without_trailing_slash_still_redirects():
+    response = client.get("/items", allow_redirects=False)
+    assert response.status_code == 307
+
+
+def test_literal_routes_respect_route_order():
+    shadowed = FastAPI()
+
+    @shadowed.get("/users/{user_id}")
+    async def read_user(user_id: str):
+        return {"user_id": user_id}
+
+    @shadowed.get("/users/me")
+    async def read_user_me():
+        return {"user_id": "the current user"}
+
+    @shadowed.post("/items/{item_id}")
+    async def create_item(item_id: str):
+        return {"item_id": item_id}
+
+    @shadowed.get("/items/new")
+    async def new_item():
+        return {"item_id": "new"}
+
+    literal_routes = LiteralRoutes(shadowed.routes)
+    assert ("GET", "/users/me") not in literal_routes.table
+    assert ("GET", "/items/new") in literal_routes.table
+    shadowed.router.routes.insert(0, literal_routes)
+    assert TestClient(shadowed).get("/users/me").json() == {"user_id": "me"}
+
+
+def test_root_is_an_alias_of_hello_world():
+    assert client.get("/").json() == client.get("/hello_world").json() == {"message": "Hello World, E!"}
+    assert client.post("/").status_code == 405
+    assert "/" not in client.get("/openapi.json").json()["paths"]
+
+
+def test_alias_keeps_the_request_url():
+    aliased = FastAPI()
+
+    @aliased.get("/target")
+    async def target(request: Request):
+        return {"path": request.url.path}
+
+    aliased.router.routes.insert(0, LiteralRoutes(aliased.routes, aliases={"/": "/target"}))
+    assert TestClient(aliased).get("/").json() == {"path": "/"}
+
+
+def test_update_item_echoes_body_with_defaults():
+    response = client.put("/items/3?q=bar", json={"name": "Foo", "price": 2})
+    assert response.status_code == 200
+    assert response.json() == {"item_id": 3, "name": "Foo", "description": None, "price": 2.0, "tax": None, "q": "bar"}
+
+
+def test_update_item_invalid_body_keeps_validation_error_shape():
+    response = client.put("/items/3", json={"name": "Foo"})
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [{"loc": ["body", "price"], "msg": "field required", "type": "value_error.missing"}]
+    }
+
+
+def test_update_item_request_body_is_documented():
+    operation = client.get("/openapi.json").json()["paths"]["/items/{item_id}"]["put"]
+    assert operation["requestBody"]["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Item"}
+
+
+def test_index_weights_accepts_keys_beyond_64_bits():
+    response = client.post("/index-weights/", json={"99999999999999999999999": 1.0, "1": 2.5})
+    assert response.status_code == 200
+    assert response.json() == {"99999999999999999999999": 1.0, "1": 2.5}
+
+
+def test_direct_responses_echo_item_ids_beyond_64_bits():
+    item_id = 99999999999999999999999
+    response = client.get(f"/path_items/{item_id}")
+    assert response.status_code == 200
+    assert response.json() == {"item_id": item_id}
+
+    response = client.put(
+        f"/body_items_v1/{item_id}", json={"item": {"name": "Foo", "price": 1}, "user": {"username": "bar"}}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "item_id": item_id,
+        "item": {"name": "Foo", "description": None, "price": 1.0, "tax": None},
+        "user": {"username": "bar", "full_name": None},
+    }
+
+
+def test_create_item_coerces_scalars_like_pydantic():
+    response = client.post("/items/", json={"name": 5, "description": 1.5, "price": "1.5", "tax": True})
+    assert response.status_code == 200
+    assert response.json() == {"name": "5", "description": "1.5", "price": 1.5, "tax": 1.0, "price_with_tax": 2.5}
+
+
+def test_update_item_coerces_numeric_strings_and_numbers_to_str():
+    response = client.put("/items/3", json={"name": "Foo", "description": 5, "price": "2"})
+    assert response.status_code == 200
+    assert response.json() == {"item_id": 3, "name": "Foo", "description": "5", "price": 2.0, "tax": None}
+
+
+def test_read_item_fragments_match_dict_output():
+    long_description = "This is an amazing item that has a long description"
+    response = client.get("/items/a\"b", params={"q": "say \"hi\" ünïcødé"})
+    assert response.content == orjson.dumps(
+        {"item_id": "a\"b", "q": "say \"hi\" ünïcødé", "description": long_description}
+    )
+    response = client.get("/items/foo", params={"short": "true"})
+    assert response.content == orjson.dumps({"item_id": "foo", "description": "short description"})
+
+
+def test_read_user_item_fragments_match_dict_output():
+    long_description = "This is an amazing item that has a long description"
+    response = client.get("/users_multi/3/items/foo", params={"q": "say \"hi\" ünïcødé"})
+    assert response.content == orjson.dumps(
+        {"item_id": "foo", "owner_id": 3, "q": "say \"hi\" ünïcødé", "description": long_description}
+    )
+    response = client.get("/users_multi/3/items/foo", params={"short": "true"})
+    assert response.content == orjson.dumps({"item_id": "foo", "owner_id": 3})
+
+
+def test_read_user_item_owner_id_beyond_64_bits():
+    response = client.get("/users_multi/99999999999999999999999/items/x", params={"short": "true"})
+    assert response.status_code == 200
+    assert response.json() == {"item_id": "x", "owner_id": 99999999999999999999999}
+
+
+def test_read_item_echoes_empty_q():
+    response = client.get("/items/x?q=")
+    assert response.json() == {"item_id": "x", "q": "", "description": "This is an amazing item that has a long description"}
+
+
+def test_create_item_zero_tax_adds_price_with_tax():
+    response = client.post("/items/", json={"name": "Foo", "price": 1.5, "tax": 0})
+    assert response.json() == {"name": "Foo", "description": None, "price": 1.5, "tax": 0.0, "price_with_tax": 1.5}